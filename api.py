@@ -0,0 +1,129 @@
+from fastapi import FastAPI, Query, HTTPException, Request
+from typing import List, Optional
+from pydantic import BaseModel
+import logging
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import config
+from live_store import LiveStateStore
+from profiler import Profiler, DEFAULT_PROFILE_SECONDS
+from models import (LiveTennisDataDB, LiveTennisData, PlayerMatchInfoDB, PlayerMatchInfo, PlayerMainInfoDB,
+                    PlayerMainInfo, PlayerFormDB, PlayerForm, to_player_form)
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The engine is built on the first query rather than at import, so workers start without touching the DB
+_session_factory = None
+
+
+def get_session_factory():
+    global _session_factory
+    if _session_factory is None:
+        engine = create_engine(config.DATABASE_URL)
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _session_factory
+
+
+class ProfileStatus(BaseModel):
+    worker: int
+    active: bool
+    profile: Optional[str] = None
+    stages: Optional[str] = None
+    breakdown: Optional[str] = None
+
+
+def require_local_client(request: Request):
+    if request.client is None or request.client.host not in ('127.0.0.1', '::1'):
+        raise HTTPException(status_code=403, detail="Profiling is only available from localhost")
+
+
+# App factory, called once per worker: `uvicorn --factory api:create_app --workers 4`
+def create_app():
+    app = FastAPI()
+
+    # Live snapshot published by the tracker, see live_store.py
+    live_store = LiveStateStore(config.LIVE_SNAPSHOT_PATH)
+
+    # Request profiling, started through /admin/profile/ on whichever worker gets the request and picked
+    # up by the other workers from the shared request file on their next request
+    api_profiler = Profiler(f'api-{os.getpid()}', config.PROFILE_DIR,
+                            request_path=os.path.join(config.PROFILE_DIR, 'api-profile-request.json'))
+
+    app.state.live_store = live_store
+    app.state.profiler = api_profiler
+
+    # Routes with pagination
+    @app.get("/live_tennis_data/", response_model=List[LiveTennisData])
+    @api_profiler.profiled('get_live_tennis_data')
+    def get_live_tennis_data(page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100)):
+        start_idx = (page - 1) * limit
+        end_idx = start_idx + limit
+        snapshot = live_store.snapshot()
+        if snapshot is not None:
+            return [record._asdict() for record in snapshot.records[start_idx:end_idx]]
+        with get_session_factory()() as session:
+            data = session.query(LiveTennisDataDB).slice(start_idx, end_idx).all()
+            return data
+
+    @app.get("/player_matches_info/", response_model=List[PlayerMatchInfo])
+    @api_profiler.profiled('get_player_matches_info')
+    def get_player_matches_info(page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100)):
+        start_idx = (page - 1) * limit
+        end_idx = start_idx + limit
+        with get_session_factory()() as session:
+            data = session.query(PlayerMatchInfoDB).slice(start_idx, end_idx).all()
+            return data
+
+    @app.get("/players_main_info/", response_model=List[PlayerMainInfo])
+    @api_profiler.profiled('get_players_main_info')
+    def get_players_main_info(page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100)):
+        start_idx = (page - 1) * limit
+        end_idx = start_idx + limit
+        with get_session_factory()() as session:
+            data = session.query(PlayerMainInfoDB).slice(start_idx, end_idx).all()
+            return data
+
+    # Player form aggregates are maintained by the tracker, so these are primary key reads
+    @app.get("/player_form/", response_model=List[PlayerForm])
+    @api_profiler.profiled('get_player_form')
+    def get_player_form(page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100)):
+        start_idx = (page - 1) * limit
+        end_idx = start_idx + limit
+        with get_session_factory()() as session:
+            rows = session.query(PlayerFormDB).order_by(PlayerFormDB.player_id).slice(start_idx, end_idx).all()
+            return [to_player_form(row) for row in rows]
+
+    @app.get("/player_form/{player_id}", response_model=PlayerForm)
+    @api_profiler.profiled('get_player_form_by_id')
+    def get_player_form_by_id(player_id: str):
+        with get_session_factory()() as session:
+            row = session.get(PlayerFormDB, player_id)
+            if row is None:
+                raise HTTPException(status_code=404, detail=f"No form data for player ID {player_id}")
+            return to_player_form(row)
+
+    def profile_status():
+        api_profiler.finish_if_due()
+        return ProfileStatus(worker=os.getpid(), active=api_profiler.active, **(api_profiler.last_report or {}))
+
+    # Admin routes for on-demand profiling. Status and reports are those of the worker answering the request.
+    @app.post("/admin/profile/", response_model=ProfileStatus, status_code=202)
+    def start_profile(request: Request, seconds: int = Query(DEFAULT_PROFILE_SECONDS, ge=1, le=600)):
+        require_local_client(request)
+        api_profiler.poll_request()
+        if not api_profiler.start(seconds=seconds):
+            raise HTTPException(status_code=409, detail="A profiling session is already running")
+        api_profiler.broadcast(seconds)
+        return profile_status()
+
+    @app.get("/admin/profile/", response_model=ProfileStatus)
+    def get_profile(request: Request):
+        require_local_client(request)
+        api_profiler.poll_request()
+        return profile_status()
+
+    return app
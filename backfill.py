@@ -0,0 +1,175 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+import config
+from snapshot_export import SnapshotExporter
+from tracker import TennisStatsTracker
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 500
+FETCH_RETRIES = 3
+DEFAULT_CHECKPOINT = 'backfill_checkpoint.json'
+PLAYER_DONE = -1
+
+
+def load_checkpoint(path):
+    # Maps player ID -> next page to fetch, or PLAYER_DONE once the history is exhausted
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    # Write to a temporary file and rename so a crash never leaves a half-written checkpoint
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+class PlayerHistoryBackfill:
+
+    def __init__(self, tracker, player_ids, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 checkpoint_path=DEFAULT_CHECKPOINT, max_pages=None):
+        self.tracker = tracker
+        self.player_ids = [str(player_id) for player_id in player_ids]
+        self.workers = workers
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.max_pages = max_pages
+        self.checkpoint = load_checkpoint(checkpoint_path)
+        self.pending_checkpoint = {}  # Progress for pages buffered but not yet committed
+        self.start_pages = {}  # First page fetched for each player in this run, for --max-pages
+        self.matches = []
+        self.results = {}
+        self.pages_fetched = 0
+        self.matches_written = 0
+        self.players_done = 0
+        self.players_failed = 0
+        self.started = time.monotonic()
+
+    def fetch_page(self, player_id, page):
+        # A page that still fails after the retries counts as failed, so one bad response never ends the run
+        try:
+            return player_id, page, self.tracker.fetch_player_data(player_id, page, retries=FETCH_RETRIES)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Failed to fetch page {page} for player ID {player_id}: {e}")
+            return player_id, page, None
+
+    def buffer_page(self, player_id, page, player_data):
+        for event in player_data['events']:
+            self.matches.append(self.tracker.build_match(event, player_id))
+            won = self.tracker.match_result(event, int(player_id))
+            if won is not None:
+                self.results[(player_id, str(event['id']))] = won
+        self.pages_fetched += 1
+
+    def flush(self):
+        if self.matches or self.results:
+            # Returns once the rows are committed or spooled to disk, so the checkpoint can move on
+            self.tracker.store_player_matches_bulk(self.matches, self.results)
+            self.matches_written += len(self.matches)
+            if self.tracker.exporter:
+                self.tracker.exporter.maybe_export()
+        self.checkpoint.update(self.pending_checkpoint)
+        save_checkpoint(self.checkpoint_path, self.checkpoint)
+        self.matches = []
+        self.results = {}
+        self.pending_checkpoint = {}
+        self.report_progress()
+
+    def report_progress(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        logger.info(f"Backfill: {self.players_done}/{len(self.player_ids)} players done, {self.players_failed} failed, "
+                    f"{self.pages_fetched} pages ({self.pages_fetched / elapsed:.1f}/s), "
+                    f"{self.matches_written} matches written ({self.matches_written / elapsed:.1f}/s)")
+
+    def run(self):
+        to_fetch = []
+        for player_id in self.player_ids:
+            next_page = self.checkpoint.get(player_id, 0)
+            if next_page == PLAYER_DONE:
+                self.players_done += 1
+            else:
+                to_fetch.append((player_id, next_page))
+                self.start_pages[player_id] = next_page
+        logger.info(f"Backfill: resuming {len(to_fetch)} players, {self.players_done} already done")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Pages of one player are fetched in order; different players are fetched in parallel
+            in_flight = {executor.submit(self.fetch_page, player_id, page) for player_id, page in to_fetch[:self.workers]}
+            queued = to_fetch[self.workers:]
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    player_id, page, player_data = future.result()
+                    if player_data is None:
+                        # Fetch failed; leave the checkpoint where it is so a rerun retries this page
+                        self.players_failed += 1
+                    else:
+                        self.buffer_page(player_id, page, player_data)
+                        has_next_page = player_data.get('hasNextPage') and player_data['events']
+                        pages_this_run = page + 1 - self.start_pages[player_id]
+                        reached_limit = self.max_pages is not None and pages_this_run >= self.max_pages
+                        if has_next_page and not reached_limit:
+                            self.pending_checkpoint[player_id] = page + 1
+                            in_flight.add(executor.submit(self.fetch_page, player_id, page + 1))
+                            continue
+                        # Stopping at --max-pages keeps the next page, so a later run carries on from there
+                        self.pending_checkpoint[player_id] = page + 1 if has_next_page else PLAYER_DONE
+                        self.players_done += 1
+                    if queued:
+                        player_id, page = queued.pop(0)
+                        in_flight.add(executor.submit(self.fetch_page, player_id, page))
+                if len(self.matches) >= self.batch_size:
+                    self.flush()
+            self.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the full match history of players into Player_matches_info.')
+    parser.add_argument('player_ids', nargs='*', help='Player IDs to backfill (default: every player in Players_main_info)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Number of concurrent page fetches')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Matches per bulk insert')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='Checkpoint file used to resume an interrupted run')
+    parser.add_argument('--max-pages', type=int, default=None, help='Fetch at most this many pages per player in this run')
+    args = parser.parse_args()
+    invalid_ids = [player_id for player_id in args.player_ids if not player_id.isdigit()]
+    if invalid_ids:
+        parser.error(f"player IDs must be numeric: {', '.join(invalid_ids)}")
+
+    exporter = None
+    if config.EXPORT_DIR:
+        exporter = SnapshotExporter(config.EXPORT_DIR, config.EXPORT_INTERVAL, config.EXPORT_FORMAT)
+    tracker = TennisStatsTracker(config.tracker_db_config(), exporter=exporter, role='backfill')
+    tracker.create_player_matches_table_if_not_exists()
+    tracker.create_player_form_tables_if_not_exists()
+    player_ids = args.player_ids
+    if not player_ids:
+        player_ids = [row[0] for row in tracker.writer.query("SELECT player_id FROM Players_main_info")]
+        skipped = [player_id for player_id in player_ids if not str(player_id).isdigit()]
+        if skipped:
+            logger.warning(f"Skipping {len(skipped)} non-numeric player IDs from Players_main_info")
+            player_ids = [player_id for player_id in player_ids if str(player_id).isdigit()]
+
+    try:
+        PlayerHistoryBackfill(tracker, player_ids, workers=args.workers, batch_size=args.batch_size,
+                              checkpoint_path=args.checkpoint, max_pages=args.max_pages).run()
+    finally:
+        tracker.close()
+
+
+if __name__ == "__main__":
+    main()
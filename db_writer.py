@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+import threading
+import time
+from itertools import groupby
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_MAX_CONNECTIONS = 2
+RECONNECT_INTERVAL = 5  # Seconds between reconnect attempts while the database is unavailable
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+# Write-behind buffer between the tracker and Postgres. Callers queue (operation, row) entries and
+# return immediately; a background thread commits them in bulk, one transaction per batch, grouping
+# consecutive rows of the same operation into a single call. While the database is unavailable,
+# batches are appended to a local JSON-lines spool file, which is replayed in order once a
+# connection succeeds again. Each process needs its own spool file; see config.spool_path().
+#
+# The drain saves the spool offset it has reached after every committed batch, so spooled rows are
+# committed once. Only a crash between a commit and saving the offset replays that batch; keyed
+# inserts absorb this, but an unkeyed insert such as the live rows can then be duplicated until
+# the next truncate.
+#
+# `operations` maps an operation name to a function (cursor, rows). `resets` maps an operation to
+# the operations it makes obsolete, so replaying a long spool can skip e.g. live rows that a later
+# truncate would have discarded anyway.
+class BufferedWriter:
+
+    def __init__(self, db_config, operations, spool_path, resets=None,
+                 batch_size=DEFAULT_BATCH_SIZE, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.db_config = db_config
+        self.operations = operations
+        self.spool_path = spool_path
+        self.resets = resets or {}
+        self.batch_size = batch_size
+        self.max_connections = max_connections
+        self.db_available = True
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._retry_at = 0
+        self._queue = []
+        self._in_flight = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, operation, *rows):
+        with self._cond:
+            self._queue.extend((operation, row) for row in rows)
+            self._cond.notify()
+
+    def flush(self, timeout=None):
+        # Blocks until everything queued so far is committed or spooled to disk
+        with self._cond:
+            self._cond.notify()
+            return self._cond.wait_for(lambda: not self._queue and not self._in_flight, timeout)
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        if self._pool is not None:
+            self._pool.closeall()
+
+    def query(self, sql, params=None):
+        # Synchronous read through the same pool; raises psycopg2.Error if the database is unavailable
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            conn.commit()
+            self._put_connection(conn)
+            return rows
+        except CONNECTION_ERRORS:
+            self._put_connection(conn, close=True)
+            raise
+        except psycopg2.Error:
+            conn.rollback()
+            self._put_connection(conn)
+            raise
+
+    def _get_connection(self):
+        # query() on the caller's thread and the writer thread can both get here first
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(1, self.max_connections, **self.db_config)
+        return self._pool.getconn()
+
+    def _put_connection(self, conn, close=False):
+        self._pool.putconn(conn, close=close or conn.closed)
+
+    def _mark_unavailable(self, error):
+        if self.db_available:
+            logger.error(f"Database unavailable, spooling writes to {self.spool_path}: {error}")
+        self.db_available = False
+        self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+
+    def _mark_available(self):
+        if not self.db_available:
+            logger.info("Database available again")
+        self.db_available = True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue and not self._closed:
+                    self._cond.wait(timeout=RECONNECT_INTERVAL)
+                if self._closed and not self._queue:
+                    return
+                batch = self._queue[:self.batch_size]
+                del self._queue[:len(batch)]
+                self._in_flight = bool(batch)
+            try:
+                # Spooled rows go first so the database always sees writes in their original order
+                if os.path.exists(self.spool_path) and not self._drain_spool():
+                    self._append_spool(batch)
+                elif batch:
+                    self._append_spool(self._execute(batch))
+            except Exception:
+                logger.exception("Unexpected error in database writer")
+            finally:
+                with self._cond:
+                    self._in_flight = False
+                    self._cond.notify_all()
+
+    def _execute(self, batch, draining=False):
+        # Commits the batch and returns the entries that could not be written and should be spooled
+        if not self.db_available and time.monotonic() < self._retry_at:
+            return batch
+        try:
+            conn = self._get_connection()
+        except psycopg2.Error as e:
+            self._mark_unavailable(e)
+            return batch
+        close = False
+        try:
+            try:
+                with conn.cursor() as cursor:
+                    for operation, entries in groupby(batch, key=lambda entry: entry[0]):
+                        self.operations[operation](cursor, [row for _, row in entries])
+                conn.commit()
+            except CONNECTION_ERRORS as e:
+                close = True
+                self._mark_unavailable(e)
+                return batch
+            except psycopg2.Error as e:
+                conn.rollback()
+                logger.error(f"Error writing batch of {len(batch)} rows, retrying row by row: {e}")
+                leftover, close = self._execute_row_by_row(conn, batch)
+                return leftover
+            except Exception:
+                logger.exception(f"Unexpected error writing batch of {len(batch)} rows")
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+                    return batch
+                if not draining:
+                    # Spool the batch; the drain retries it row by row, so one bad row cannot block the spool
+                    return batch
+                leftover, close = self._execute_row_by_row(conn, batch)
+                return leftover
+            self._mark_available()
+            return []
+        finally:
+            self._put_connection(conn, close=close)
+
+    def _execute_row_by_row(self, conn, batch):
+        # Keeps one bad row from failing the whole batch; rows that still fail are logged and dropped.
+        # Returns the entries left unwritten because the connection failed, and whether to close it.
+        for i, (operation, row) in enumerate(batch):
+            try:
+                with conn.cursor() as cursor:
+                    self.operations[operation](cursor, [row])
+                conn.commit()
+            except CONNECTION_ERRORS as e:
+                self._mark_unavailable(e)
+                return batch[i:], True
+            except Exception as e:
+                logger.error(f"Dropping {operation} row that could not be written: {e}")
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    return batch[i + 1:], True
+        self._mark_available()
+        return [], False
+
+    def _append_spool(self, entries):
+        if not entries:
+            return
+        with open(self.spool_path, 'a') as f:
+            for operation, row in entries:
+                f.write(json.dumps([operation, row]) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_offset(self):
+        try:
+            with open(f'{self.spool_path}.offset') as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _save_offset(self, offset):
+        tmp_path = f'{self.spool_path}.offset.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+        os.replace(tmp_path, f'{self.spool_path}.offset')
+
+    def _spool_lines(self, offset):
+        # Yields complete lines with the offset just past each; a torn final line from a crash is ignored
+        with open(self.spool_path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    return
+                yield line, f.tell()
+
+    def _read_spool(self, offset=0):
+        # Two passes: find where each reset operation last appears, then skip entries it makes obsolete.
+        # Yields (operation, row, offset after the entry).
+        last_reset = {}
+        for i, (line, _) in enumerate(self._spool_lines(offset)):
+            for obsolete in self.resets.get(json.loads(line)[0], ()):
+                last_reset[obsolete] = i
+        for i, (line, end) in enumerate(self._spool_lines(offset)):
+            operation, row = json.loads(line)
+            if i >= last_reset.get(operation, -1):
+                yield operation, row, end
+
+    def _commit_spooled(self, batch, offsets):
+        leftover = self._execute(batch, draining=True)
+        committed = len(batch) - len(leftover)
+        if committed:
+            self._save_offset(offsets[committed - 1])
+        return not leftover
+
+    def _drain_spool(self):
+        if not self.db_available and time.monotonic() < self._retry_at:
+            return False
+        started = time.monotonic()
+        drained = 0
+        batch, offsets = [], []
+        for operation, row, end in self._read_spool(self._read_offset()):
+            batch.append((operation, row))
+            offsets.append(end)
+            if len(batch) >= self.batch_size:
+                if not self._commit_spooled(batch, offsets):
+                    return False
+                drained += len(batch)
+                batch, offsets = [], []
+        if batch and not self._commit_spooled(batch, offsets):
+            return False
+        drained += len(batch)
+        os.remove(self.spool_path)
+        if os.path.exists(f'{self.spool_path}.offset'):
+            os.remove(f'{self.spool_path}.offset')
+        logger.info(f"Drained {drained} spooled rows in {time.monotonic() - started:.1f} seconds")
+        return True
@@ -0,0 +1,67 @@
+import json
+import os
+import time
+from collections import namedtuple
+
+# One row of Live_Tennis_Data; namedtuples keep the records slot-sized and immutable
+LiveRecord = namedtuple('LiveRecord', [
+    'id', 'tournament', 'round', 'home_team', 'away_team', 'match_progress', 'period',
+    'home_score', 'away_score', 'statistic_group', 'statistic_name', 'home_stat', 'away_stat',
+    'home_player_id', 'away_player_id'
+])
+
+# max_age is set by the publisher from its cycle length: how long readers may keep serving the snapshot
+LiveSnapshot = namedtuple('LiveSnapshot', ['published_at', 'max_age', 'records'])
+
+
+def to_live_record(row_id, data):
+    # data is the 14-column tuple the tracker inserts into Live_Tennis_Data
+    return LiveRecord(row_id, *('' if value is None else str(value) for value in data))
+
+
+# Holds the tracker's latest live matches and statistics in memory. The tracker publishes a complete
+# snapshot once per cycle and readers see either the previous or the new one, never a partial one.
+# With a path the snapshot is also written there (ideally on a tmpfs such as /dev/shm) so API workers
+# in other processes can serve it; they reload the file only when its modification time changes.
+class LiveStateStore:
+
+    def __init__(self, path=None):
+        self.path = path
+        self._snapshot = None
+        self._loaded_mtime = None
+
+    def publish(self, rows, max_age=None):
+        snapshot = LiveSnapshot(time.time(), max_age, tuple(to_live_record(i, row) for i, row in enumerate(rows, start=1)))
+        self._snapshot = snapshot  # A single reference assignment, so the swap is atomic
+        if self.path:
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'published_at': snapshot.published_at, 'max_age': snapshot.max_age, 'records': snapshot.records}, f)
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        self._snapshot = LiveSnapshot(data['published_at'], data.get('max_age'), tuple(LiveRecord(*record) for record in data['records']))
+        self._loaded_mtime = mtime
+
+    def snapshot(self, max_age=None):
+        # Returns None when nothing has been published yet or the last snapshot is older than max_age seconds,
+        # which defaults to the limit the publisher attached to the snapshot
+        if self.path:
+            self._reload()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        if max_age is None:
+            max_age = snapshot.max_age
+        if max_age is not None and time.time() - snapshot.published_at > max_age:
+            return None
+        return snapshot
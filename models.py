@@ -0,0 +1,119 @@
+from typing import Optional
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.ext.declarative import declarative_base
+
+# SQLAlchemy models
+Base = declarative_base()
+
+class LiveTennisDataDB(Base):
+    __tablename__ = 'Live_Tennis_Data'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tournament = Column(String)
+    round = Column(String)
+    home_team = Column(String)
+    away_team = Column(String)
+    match_progress = Column(String)
+    period = Column(String)
+    home_score = Column(String)
+    away_score = Column(String)
+    statistic_group = Column(String)
+    statistic_name = Column(String)
+    home_stat = Column(String)
+    away_stat = Column(String)
+    home_player_id = Column(String)
+    away_player_id = Column(String)
+
+# Pydantic models for validation
+class LiveTennisData(BaseModel):
+    id: int
+    tournament: str
+    round: str
+    home_team: str
+    away_team: str
+    match_progress: str
+    period: str
+    home_score: str
+    away_score: str
+    statistic_group: Optional[str] = None
+    statistic_name: Optional[str] = None
+    home_stat: Optional[str] = None
+    away_stat: Optional[str] = None
+    home_player_id: Optional[str] = None
+    away_player_id: Optional[str] = None
+
+class PlayerMatchInfoDB(Base):
+    __tablename__ = 'Player_matches_info'
+    match_id = Column(String, primary_key=True)
+    tournament = Column(String)
+    status = Column(String)
+    start_time = Column(String)
+    home_team = Column(String)
+    away_team = Column(String)
+    home_score = Column(String)
+    away_score = Column(String)
+    player_id = Column(String)
+
+class PlayerFormDB(Base):
+    __tablename__ = 'player_form_stats'
+    player_id = Column(String, primary_key=True)
+    matches_played = Column(Integer)
+    wins = Column(Integer)
+    losses = Column(Integer)
+    stat_matches = Column(Integer)
+    aces = Column(Integer)
+    double_faults = Column(Integer)
+    break_points_won = Column(Integer)
+    break_points_total = Column(Integer)
+
+class PlayerMainInfoDB(Base):
+    __tablename__ = 'Players_main_info'
+    player_id = Column(String, primary_key=True)
+    name = Column(String)
+    country = Column(String)
+    ranking = Column(Integer)
+
+# Define Pydantic models for PlayerMatchInfo and PlayerMainInfo
+class PlayerMatchInfo(BaseModel):
+    match_id: str
+    tournament: str
+    status: str
+    start_time: str
+    home_team: str
+    away_team: str
+    home_score: str
+    away_score: str
+    player_id: str
+
+class PlayerMainInfo(BaseModel):
+    player_id: str
+    name: str
+    country: str
+    ranking: int
+
+class PlayerForm(BaseModel):
+    player_id: str
+    matches_played: int
+    wins: int
+    losses: int
+    win_rate: Optional[float] = None
+    stat_matches: int
+    avg_aces: Optional[float] = None
+    avg_double_faults: Optional[float] = None
+    break_point_conversion: Optional[float] = None
+
+def ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+def to_player_form(row):
+    return PlayerForm(
+        player_id=row.player_id,
+        matches_played=row.matches_played,
+        wins=row.wins,
+        losses=row.losses,
+        win_rate=ratio(row.wins, row.matches_played),
+        stat_matches=row.stat_matches,
+        avg_aces=ratio(row.aces, row.stat_matches),
+        avg_double_faults=ratio(row.double_faults, row.stat_matches),
+        break_point_conversion=ratio(row.break_points_won, row.break_points_total)
+    )
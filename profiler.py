@@ -0,0 +1,206 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_PROFILE_CYCLES = 3
+DEFAULT_PROFILE_SECONDS = 30
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'tennis_profiles')
+REQUEST_POLL_INTERVAL = 1  # Seconds between checks of the shared request file
+
+_INACTIVE_STAGE = nullcontext()
+
+
+class _Stage:
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.profile = None
+
+    def __enter__(self):
+        local = self.profiler._local
+        # Nested stages are timed but only the outermost one runs cProfile on this thread
+        if not getattr(local, 'profiling', False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per interpreter, so a concurrent stage is only timed
+                profile = None
+            else:
+                local.profiling = True
+                self.profile = profile
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.disable()
+            self.profiler._local.profiling = False
+        self.profiler._record(self.name, elapsed, self.profile)
+        return False
+
+
+# Opt-in profiler for tracker cycles and API requests. While inactive, stage() returns a shared
+# no-op context manager, so instrumented code pays one attribute check. A session runs for a number
+# of tracker cycles or seconds, then writes a merged cProfile file and a per-stage timing table.
+#
+# Profilers in separate processes, such as API workers, can share a request_path: broadcast() writes
+# a request there and every profiler polling the file starts a session of its own until it expires.
+class Profiler:
+
+    def __init__(self, name, output_dir=DEFAULT_PROFILE_DIR, request_path=None):
+        self.name = name
+        self.output_dir = output_dir
+        self.request_path = request_path
+        self.active = False
+        self.last_report = None
+        self._toggle_requested = False
+        self._seen_request = None
+        self._next_poll = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self, cycles=None, seconds=None):
+        if not cycles and not seconds:
+            seconds = DEFAULT_PROFILE_SECONDS
+        self.finish_if_due()
+        with self._lock:
+            if self.active:
+                return False
+            self.remaining_cycles = cycles
+            self.deadline = time.monotonic() + seconds if seconds else None
+            self.stage_times = {}
+            self.profiles = []
+            self.started_at = time.time()
+            self.started_monotonic = time.monotonic()
+            self.active = True
+        logger.info(f"Profiling {self.name} for {f'{cycles} cycles' if cycles else f'{seconds:.0f} seconds'}")
+        return True
+
+    def stop(self):
+        # Ends the session at the next stage or cycle boundary, which is safe to call from a signal handler
+        self.deadline = time.monotonic()
+
+    def toggle(self, cycles=DEFAULT_PROFILE_CYCLES):
+        if self.active:
+            self.stop()
+            self.finish_if_due()
+        else:
+            self.start(cycles=cycles)
+
+    def request_toggle(self):
+        # For signal handlers: toggle() takes the lock the interrupted thread may hold, so the
+        # toggle is deferred to the next end_cycle()
+        self._toggle_requested = True
+
+    def broadcast(self, seconds):
+        # Asks every profiler polling request_path to profile the next `seconds` seconds
+        request_id = f'{os.getpid()}-{time.time()}'
+        self._seen_request = request_id
+        os.makedirs(os.path.dirname(self.request_path), exist_ok=True)
+        tmp_path = f'{self.request_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'id': request_id, 'until': time.time() + seconds}, f)
+        os.replace(tmp_path, self.request_path)
+
+    def poll_request(self):
+        # Reads the shared request file at most once per REQUEST_POLL_INTERVAL
+        now = time.monotonic()
+        if self.request_path is None or now < self._next_poll:
+            return
+        self._next_poll = now + REQUEST_POLL_INTERVAL
+        try:
+            with open(self.request_path) as f:
+                request = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if request['id'] == self._seen_request:
+            return
+        self._seen_request = request['id']
+        remaining = request['until'] - time.time()
+        if remaining > 0:
+            self.start(seconds=remaining)
+
+    def stage(self, name):
+        if not self.active:
+            return _INACTIVE_STAGE
+        return _Stage(self, name)
+
+    def profiled(self, name):
+        def decorator(func):
+            # functools.wraps keeps the signature visible so FastAPI still sees the route parameters
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                self.poll_request()
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def end_cycle(self):
+        if self.active:
+            with self._lock:
+                if self.remaining_cycles is not None:
+                    self.remaining_cycles -= 1
+            self.finish_if_due()
+        if self._toggle_requested:
+            self._toggle_requested = False
+            self.toggle()
+
+    def _record(self, name, elapsed, profile):
+        with self._lock:
+            calls, total, longest = self.stage_times.get(name, (0, 0.0, 0.0))
+            self.stage_times[name] = (calls + 1, total + elapsed, max(longest, elapsed))
+            if profile is not None:
+                self.profiles.append(profile)
+        self.finish_if_due()
+
+    def finish_if_due(self):
+        # Also called by status checks, so a timed session ends even when no stage runs after its deadline
+        with self._lock:
+            if not self.active:
+                return
+            cycles_done = self.remaining_cycles is not None and self.remaining_cycles <= 0
+            time_up = self.deadline is not None and time.monotonic() >= self.deadline
+            if not (cycles_done or time_up):
+                return
+            self.active = False
+            stage_times, profiles = self.stage_times, self.profiles
+        self.last_report = self._dump(stage_times, profiles)
+
+    def _dump(self, stage_times, profiles):
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}")
+        profile_path = f'{prefix}.prof'
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(profile_path)
+        else:
+            profile_path = None
+
+        # Shares are of the session's wall time, so nested stages and idle time are not double counted
+        wall_time = max(time.monotonic() - self.started_monotonic, 1e-6)
+        lines = [f"{'stage':<24}{'calls':>8}{'total s':>12}{'mean ms':>12}{'max ms':>12}{'share':>8}"]
+        for name, (calls, total, longest) in sorted(stage_times.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append(f"{name:<24}{calls:>8}{total:>12.3f}{total / calls * 1000:>12.2f}"
+                         f"{longest * 1000:>12.2f}{total / wall_time:>8.1%}")
+        breakdown = '\n'.join(lines)
+        breakdown_path = f'{prefix}-stages.txt'
+        with open(breakdown_path, 'w') as f:
+            f.write(breakdown + '\n')
+        logger.info(f"Profile of {self.name} written to {profile_path or '(no samples)'} and {breakdown_path}\n{breakdown}")
+        return {'profile': profile_path, 'stages': breakdown_path, 'breakdown': breakdown}
@@ -0,0 +1,192 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+from live_store import LiveRecord
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_EXPORT_INTERVAL = 300  # Seconds between exports
+EXPORT_FORMATS = ('parquet', 'arrow')
+
+LIVE_COLUMNS = list(LiveRecord._fields[1:])
+MATCH_COLUMNS = ['match_id', 'tournament', 'status', 'start_time', 'home_team', 'away_team',
+                 'home_score', 'away_score', 'player_id']
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _import_pyarrow():
+    # pyarrow is heavy and only needed when exports are enabled, so it is imported on first use
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.fs
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Snapshot exports need pyarrow; install it or leave EXPORT_DIR unset") from None
+    return pyarrow
+
+
+# Columnar snapshots of what the tracker writes, so analytics can read files instead of querying
+# Postgres. Rows are buffered in memory and every export_interval seconds appended as new files to a
+# hive-partitioned dataset per table (<export_dir>/<table>/date=.../tournament=.../part-*.parquet).
+# Only rows seen since the previous export are written, so each export is incremental.
+#
+# Incremental exports leave many small files in a partition. Once a date is over, the files of each
+# of its partitions this process wrote to are merged into one. A lock file per table keeps the
+# tracker and the backfill from compacting a partition while the other is writing to it.
+class SnapshotExporter:
+
+    def __init__(self, export_dir, export_interval=DEFAULT_EXPORT_INTERVAL, export_format='parquet'):
+        self.pa = _import_pyarrow()
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {export_format!r}, expected one of {EXPORT_FORMATS}")
+        self.export_dir = export_dir
+        self.export_interval = export_interval
+        self.export_format = export_format
+        self.live_rows = []
+        self.match_rows = {}  # match ID -> row; later rows for the same match replace earlier ones
+        self.exported_match_ids = set()
+        self.written_dates = {}  # table name -> dates written to and not yet compacted
+        self.schemas = {
+            'live_tennis_data': self.pa.schema([(name, self.pa.string()) for name in LIVE_COLUMNS] +
+                                               [('captured_at', self.pa.timestamp('us', tz='UTC')),
+                                                ('date', self.pa.string())]),
+            'player_matches_info': self.pa.schema([(name, self.pa.string()) for name in MATCH_COLUMNS + ['date']]),
+        }
+        self.extension = 'parquet' if export_format == 'parquet' else 'arrow'
+        self.last_export = time.monotonic()
+        self.exports = 0
+
+    def add_live_row(self, data):
+        self.live_rows.append((time.time(), data))
+
+    def add_match_row(self, row):
+        # row is the Player_matches_info tuple; only matches not exported by this process are kept
+        if row[0] not in self.exported_match_ids:
+            self.match_rows[row[0]] = row
+
+    def maybe_export(self):
+        # Exports are best effort: a failure is logged and the buffered rows are retried next time
+        if time.monotonic() - self.last_export >= self.export_interval:
+            try:
+                self.export()
+            except Exception:
+                logger.exception(f"Snapshot export to {self.export_dir} failed")
+
+    def export(self):
+        self.last_export = time.monotonic()
+        self.exports += 1
+        # Unique per export so new files never replace earlier ones in the same partition
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.exports}"
+        if self.live_rows:
+            captured = [datetime.fromtimestamp(captured_at, timezone.utc) for captured_at, _ in self.live_rows]
+            columns = {name: [_text(data[i]) for _, data in self.live_rows] for i, name in enumerate(LIVE_COLUMNS)}
+            columns['captured_at'] = captured
+            columns['date'] = [moment.strftime('%Y-%m-%d') for moment in captured]
+            self._write('live_tennis_data', columns, stamp)
+            self.live_rows = []
+        if self.match_rows:
+            rows = list(self.match_rows.values())
+            columns = {name: [_text(row[i]) for row in rows] for i, name in enumerate(MATCH_COLUMNS)}
+            columns['date'] = [row[3][:10] for row in rows]  # start_time is 'YYYY-MM-DD HH:MM:SS'
+            self._write('player_matches_info', columns, stamp)
+            self.exported_match_ids.update(self.match_rows)
+            self.match_rows = {}
+        self.compact_finished_dates()
+
+    def _write(self, table_name, columns, stamp):
+        pa = self.pa
+        table = pa.table(columns, schema=self.schemas[table_name])
+        partitioning = pa.dataset.partitioning(pa.schema([('date', pa.string()), ('tournament', pa.string())]),
+                                               flavor='hive')
+        with self._locked(table_name):
+            pa.dataset.write_dataset(table, os.path.join(self.export_dir, table_name),
+                                     format='parquet' if self.export_format == 'parquet' else 'ipc',
+                                     partitioning=partitioning,
+                                     basename_template=f'part-{stamp}-{{i}}.{self.extension}',
+                                     existing_data_behavior='overwrite_or_ignore')
+        self.written_dates.setdefault(table_name, set()).update(columns['date'])
+        logger.info(f"Exported {table.num_rows} {table_name} rows to {self.export_dir}")
+
+    @contextmanager
+    def _locked(self, table_name):
+        table_dir = os.path.join(self.export_dir, table_name)
+        os.makedirs(table_dir, exist_ok=True)
+        try:
+            import fcntl
+        except ImportError:
+            # No fcntl on Windows: exports still work, but two processes must not export to one directory
+            yield table_dir
+            return
+        with open(os.path.join(table_dir, '_lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield table_dir
+
+    def compact_finished_dates(self):
+        # Live rows are dated in UTC and matches by their local start time; a date is over in both
+        today = min(date.today(), datetime.now(timezone.utc).date()).isoformat()
+        for table_name, dates in self.written_dates.items():
+            for finished in sorted(day for day in dates if day is not None and day < today):
+                self.compact(table_name, finished)
+                dates.discard(finished)
+
+    def compact(self, table_name, day):
+        # Merges the files of each tournament partition of the date into a single file. The merged file
+        # is renamed into place before the parts are removed, so readers never miss rows; a crash in
+        # between can leave rows duplicated until the date is compacted again.
+        with self._locked(table_name) as table_dir:
+            date_dir = os.path.join(table_dir, f'date={day}')
+            if not os.path.isdir(date_dir):
+                return
+            for partition in os.listdir(date_dir):
+                partition_dir = os.path.join(date_dir, partition)
+                parts = sorted(os.path.join(partition_dir, name) for name in os.listdir(partition_dir)
+                               if name.startswith('part-') and name.endswith(f'.{self.extension}'))
+                if len(parts) > 1:
+                    self._merge(parts, partition_dir)
+
+    def _merge(self, parts, partition_dir):
+        pa = self.pa
+        table = pa.dataset.dataset(parts, format='parquet' if self.export_format == 'parquet' else 'ipc').to_table()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        merged_path = os.path.join(partition_dir, f'part-compacted-{stamp}.{self.extension}')
+        # Files starting with '_' are skipped by dataset readers, so the half-written file is never read
+        tmp_path = os.path.join(partition_dir, f'_compacting.{self.extension}')
+        if self.export_format == 'parquet':
+            pa.parquet.write_table(table, tmp_path)
+        else:
+            with pa.ipc.new_file(tmp_path, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, merged_path)
+        for part in parts:
+            if part != merged_path:
+                os.remove(part)
+        logger.info(f"Compacted {len(parts)} files into {merged_path}")
+
+
+def detect_format(table_dir):
+    # Exports of one directory share a format, so the first data file found tells which it is
+    for _, _, names in os.walk(table_dir):
+        for name in names:
+            if name.startswith('part-'):
+                return 'arrow' if name.endswith('.arrow') else 'parquet'
+    return 'parquet'
+
+
+def load_snapshot(export_dir, table_name, export_format=None, filter=None, columns=None):
+    # Reads an exported table through memory-mapped files; Arrow IPC exports are read without copying.
+    # The format is detected from the files unless given. filter is a pyarrow.dataset expression,
+    # e.g. ds.field('date') >= '2024-05-01'
+    pa = _import_pyarrow()
+    table_dir = os.path.join(export_dir, table_name)
+    export_format = export_format or detect_format(table_dir)
+    dataset = pa.dataset.dataset(table_dir, format='parquet' if export_format == 'parquet' else 'ipc',
+                                 partitioning='hive', filesystem=pa.fs.LocalFileSystem(use_mmap=True))
+    return dataset.to_table(filter=filter, columns=columns)
@@ -0,0 +1,133 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('psycopg2')
+requests = pytest.importorskip('requests')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracker  # noqa: E402
+from backfill import PLAYER_DONE, PlayerHistoryBackfill, load_checkpoint  # noqa: E402
+from tracker import TennisStatsTracker  # noqa: E402
+
+
+class FakeTracker:
+    # Serves `pages[player_id]` as the player's history; a page may be an exception to raise
+
+    exporter = None
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+        self.stored = []
+
+    def fetch_player_data(self, player_id, page=0, retries=0):
+        self.fetched.append((player_id, page))
+        pages = self.pages[player_id]
+        if page >= len(pages):
+            return {'events': [], 'hasNextPage': False}
+        if isinstance(pages[page], Exception):
+            raise pages[page]
+        return {'events': pages[page], 'hasNextPage': page + 1 < len(pages)}
+
+    def build_match(self, event, player_id):
+        return {'id': event['id'], 'player_id': player_id}
+
+    def match_result(self, event, player_id):
+        return None
+
+    def store_player_matches_bulk(self, matches, results):
+        self.stored.extend(match['id'] for match in matches)
+
+
+def history(player_id, pages):
+    return [[{'id': f'{player_id}-{page}'}] for page in range(pages)]
+
+
+def run_backfill(fake, player_ids, checkpoint_path, **kwargs):
+    backfill = PlayerHistoryBackfill(fake, player_ids, workers=2, batch_size=1, checkpoint_path=checkpoint_path, **kwargs)
+    backfill.run()
+    return backfill
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / 'checkpoint.json')
+
+
+def test_backfill_fetches_every_page_and_marks_players_done(checkpoint_path):
+    fake = FakeTracker({'1': history('1', 3), '2': history('2', 1)})
+    run_backfill(fake, ['1', '2'], checkpoint_path)
+    assert sorted(fake.stored) == ['1-0', '1-1', '1-2', '2-0']
+    assert load_checkpoint(checkpoint_path) == {'1': PLAYER_DONE, '2': PLAYER_DONE}
+
+
+def test_max_pages_saves_the_next_page_and_a_later_run_resumes_there(checkpoint_path):
+    fake = FakeTracker({'1': history('1', 5)})
+    run_backfill(fake, ['1'], checkpoint_path, max_pages=2)
+    assert load_checkpoint(checkpoint_path) == {'1': 2}
+
+    fake = FakeTracker({'1': history('1', 5)})
+    run_backfill(fake, ['1'], checkpoint_path, max_pages=2)
+    assert fake.fetched == [('1', 2), ('1', 3)]
+    assert load_checkpoint(checkpoint_path) == {'1': 4}
+
+
+def test_done_players_are_skipped_on_resume(checkpoint_path):
+    fake = FakeTracker({'1': history('1', 1), '2': history('2', 1)})
+    run_backfill(fake, ['1'], checkpoint_path)
+    fake.fetched = []
+    backfill = run_backfill(fake, ['1', '2'], checkpoint_path)
+    assert fake.fetched == [('2', 0)]
+    assert backfill.players_done == 2
+
+
+def test_network_error_fails_the_player_without_ending_the_run(checkpoint_path):
+    pages = history('1', 3)
+    pages[1] = requests.ConnectionError('connection reset')
+    fake = FakeTracker({'1': pages, '2': history('2', 2)})
+    backfill = run_backfill(fake, ['1', '2'], checkpoint_path)
+    assert backfill.players_failed == 1
+    assert sorted(fake.stored) == ['1-0', '2-0', '2-1']
+    # The failed page is where a rerun picks up
+    assert load_checkpoint(checkpoint_path) == {'1': 1, '2': PLAYER_DONE}
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def test_fetch_player_data_retries_transient_failures_with_backoff(monkeypatch):
+    responses = [requests.Timeout('read timed out'), FakeResponse(503), FakeResponse(200, {'events': []})]
+    calls, sleeps = [], []
+
+    def get(url, headers=None, timeout=None):
+        calls.append(timeout)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(tracker.requests, 'get', get)
+    monkeypatch.setattr(tracker.time, 'sleep', sleeps.append)
+    player_tracker = TennisStatsTracker({}, writer=object())
+    assert player_tracker.fetch_player_data('1', retries=3) == {'events': []}
+    assert calls == [tracker.HTTP_TIMEOUT] * 3
+    assert sleeps == [tracker.HTTP_BACKOFF_DELAY, 2 * tracker.HTTP_BACKOFF_DELAY]
+
+
+def test_fetch_player_data_does_not_retry_client_errors(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tracker.requests, 'get', lambda url, headers=None, timeout=None: calls.append(url) or FakeResponse(400))
+    monkeypatch.setattr(tracker.time, 'sleep', lambda seconds: None)
+    player_tracker = TennisStatsTracker({}, writer=object())
+    assert player_tracker.fetch_player_data('1', retries=3) is None
+    assert len(calls) == 1
@@ -0,0 +1,181 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_writer  # noqa: E402
+from db_writer import BufferedWriter  # noqa: E402
+
+
+class FakeCursor:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeConnection:
+
+    def __init__(self, db):
+        self.db = db
+        self.closed = 0
+        self.pending = []
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.db.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+class FakeDatabase:
+    # Operations append to the connection's pending list; commit moves them to `committed`
+
+    def __init__(self):
+        self.committed = []
+        self.down = False
+        self.fail_on = {}  # row -> exception raised when that row is written
+        self.connection = FakeConnection(self)
+        self.returned = []
+
+    def getconn(self):
+        if self.down:
+            raise psycopg2.OperationalError('connection refused')
+        return self.connection
+
+    def putconn(self, conn, close=False):
+        self.returned.append(close)
+
+    def closeall(self):
+        pass
+
+    def operation(self, cursor, rows):
+        for row in rows:
+            if row in self.fail_on:
+                raise self.fail_on[row]
+            self.connection.pending.append(row)
+
+
+@pytest.fixture
+def db():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def writer(db, tmp_path, monkeypatch):
+    # A long reconnect interval keeps the background thread idle, so tests drive the writer directly
+    monkeypatch.setattr(db_writer, 'RECONNECT_INTERVAL', 3600)
+    writer = BufferedWriter({}, {'reset': db.operation, 'row': db.operation}, str(tmp_path / 'spool.jsonl'),
+                            resets={'reset': ('reset', 'row')}, batch_size=2)
+    writer._pool = db
+    yield writer
+    db.down = False
+    writer.close()
+
+
+def write_spool(writer, entries):
+    with open(writer.spool_path, 'w') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+
+
+def test_read_spool_skips_entries_made_obsolete_by_a_later_reset(writer):
+    write_spool(writer, [['row', 'a'], ['reset', 'r1'], ['row', 'b'], ['reset', 'r2'], ['row', 'c']])
+    assert [(operation, row) for operation, row, _ in writer._read_spool()] == [('reset', 'r2'), ('row', 'c')]
+
+
+def test_read_spool_ignores_a_torn_final_line(writer):
+    write_spool(writer, [['row', 'a']])
+    with open(writer.spool_path, 'a') as f:
+        f.write('["row", "b')
+    assert [row for _, row, _ in writer._read_spool()] == ['a']
+
+
+def test_partial_drain_resumes_after_the_last_committed_batch(writer, db):
+    write_spool(writer, [['row', 'a'], ['row', 'b'], ['row', 'c'], ['row', 'd']])
+    db.fail_on['c'] = psycopg2.OperationalError('server closed the connection')
+    assert not writer._drain_spool()
+    assert db.committed == ['a', 'b']
+
+    del db.fail_on['c']
+    writer._retry_at = 0
+    assert writer._drain_spool()
+    assert db.committed == ['a', 'b', 'c', 'd']
+    assert not os.path.exists(writer.spool_path)
+    assert not os.path.exists(f'{writer.spool_path}.offset')
+
+
+def test_rejected_row_is_dropped_and_the_rest_of_the_batch_committed(writer, db):
+    db.fail_on['bad'] = psycopg2.DataError('invalid input syntax')
+    assert writer._execute([('row', 'good'), ('row', 'bad')]) == []
+    assert db.committed == ['good']
+    assert db.returned == [False]
+
+
+def test_unavailable_database_returns_the_batch_for_spooling(writer, db):
+    db.down = True
+    batch = [('row', 'a')]
+    assert writer._execute(batch) == batch
+    assert not writer.db_available
+
+
+def test_unexpected_error_returns_the_connection_and_spools_the_batch(writer, db):
+    db.fail_on['bug'] = TypeError('not a row')
+    batch = [('row', 'ok'), ('row', 'bug')]
+    assert writer._execute(batch) == batch
+    assert db.committed == []
+    assert db.returned == [False]
+
+
+def test_unexpected_error_while_draining_drops_only_the_failing_row(writer, db):
+    write_spool(writer, [['row', 'ok'], ['row', 'bug']])
+    db.fail_on['bug'] = TypeError('not a row')
+    assert writer._drain_spool()
+    assert db.committed == ['ok']
+
+
+def test_writes_are_spooled_while_down_and_drained_on_recovery(writer, db):
+    db.down = True
+    writer.write('row', 'a', 'b')
+    writer.flush()
+    assert os.path.exists(writer.spool_path)
+
+    db.down = False
+    writer._retry_at = 0
+    writer.write('row', 'c')
+    writer.flush()
+    assert db.committed == ['a', 'b', 'c']
+    assert not os.path.exists(writer.spool_path)
+
+
+def test_concurrent_first_connections_share_one_pool(tmp_path, monkeypatch):
+    created = []
+
+    class SlowPool(FakeDatabase):
+        def __init__(self, *args, **kwargs):
+            super().__init__()
+            created.append(self)
+            time.sleep(0.05)
+
+    monkeypatch.setattr(db_writer, 'ThreadedConnectionPool', SlowPool)
+    writer = BufferedWriter({}, {}, str(tmp_path / 'spool.jsonl'))
+    threads = [threading.Thread(target=writer._get_connection) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+    assert len(created) == 1
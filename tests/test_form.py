@@ -0,0 +1,150 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('psycopg2')
+pytest.importorskip('requests')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracker  # noqa: E402
+from tracker import TennisStatsTracker  # noqa: E402
+
+
+class FakeWriter:
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, operation, *rows):
+        self.writes.extend((operation, row) for row in rows)
+
+    def flush(self, timeout=None):
+        return True
+
+    def rows(self, operation):
+        return [row for written, row in self.writes if written == operation]
+
+
+class FakeLedger:
+    # Stands in for execute_values: keeps the ledger flags and the upserted form totals
+
+    def __init__(self):
+        self.flags = set()  # (column, player_id, match_id)
+        self.totals = {}  # player_id -> {column: value}
+
+    def __call__(self, cursor, sql, rows, fetch=False):
+        if 'player_form_ledger' in sql:
+            column = 'result_counted' if 'result_counted' in sql else 'stats_counted'
+            counted = [(player_id, match_id) for player_id, match_id, _ in rows
+                       if (column, player_id, match_id) not in self.flags]
+            self.flags.update((column, *key) for key in counted)
+            return counted
+        columns = sql[sql.index('(') + 1:sql.index(')')].replace('\n', ' ').split(',')
+        columns = [column.strip() for column in columns]
+        for row in rows:
+            totals = self.totals.setdefault(row[0], {})
+            for column, value in zip(columns[1:], row[1:]):
+                totals[column] = totals.get(column, 0) + value
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    ledger = FakeLedger()
+    monkeypatch.setattr(tracker, 'execute_values', ledger)
+    return ledger
+
+
+@pytest.fixture
+def stats_tracker():
+    return TennisStatsTracker({}, writer=FakeWriter())
+
+
+def event(status='finished', winner_code=1, home_id=1, away_id=2):
+    return {'id': 99, 'status': {'type': status}, 'winnerCode': winner_code,
+            'homeTeam': {'id': home_id}, 'awayTeam': {'id': away_id}}
+
+
+def statistics(aces=('3', '1')):
+    return {'statistics': [{'period': 'ALL', 'groups': [
+        {'groupName': 'Service', 'statisticsItems': [{'name': 'Aces', 'home': aces[0], 'away': aces[1]},
+                                                     {'name': 'Double faults', 'home': '2', 'away': '0'}]},
+        {'groupName': 'Return', 'statisticsItems': [{'name': 'Break points converted',
+                                                     'home': '2/5 (40%)', 'away': '0/3 (0%)'}]},
+    ]}]}
+
+
+def test_match_result_for_home_and_away_players(stats_tracker):
+    assert stats_tracker.match_result(event(winner_code=1), 1) is True
+    assert stats_tracker.match_result(event(winner_code=1), 2) is False
+    assert stats_tracker.match_result(event(winner_code=2), 2) is True
+
+
+def test_match_result_is_none_until_there_is_a_winner(stats_tracker):
+    assert stats_tracker.match_result(event(status='inprogress'), 1) is None
+    assert stats_tracker.match_result(event(winner_code=3), 1) is None
+
+
+def test_results_are_counted_once_per_player_and_match(ledger):
+    tracker.count_form_results(None, [('1', '10', True), ('1', '11', False), ('1', '10', True)])
+    tracker.count_form_results(None, [('1', '10', True), ('1', '12', True)])
+    assert ledger.totals['1'] == {'matches_played': 3, 'wins': 2, 'losses': 1}
+
+
+def test_stats_are_counted_once_per_player_and_match(ledger):
+    tracker.count_form_stats(None, [('1', '10', 3, 1, 2, 5)])
+    tracker.count_form_stats(None, [('1', '10', 3, 1, 2, 5), ('1', '11', 1, 0, 0, 2)])
+    assert ledger.totals['1'] == {'stat_matches': 2, 'aces': 4, 'double_faults': 1,
+                                  'break_points_won': 2, 'break_points_total': 7}
+
+
+def test_finished_match_is_folded_with_its_final_statistics(stats_tracker):
+    stats_tracker.live_form_players[99] = (1, 2)
+    stats_tracker.fetch_event = lambda event_id: event()
+    stats_tracker.fetch_statistics = lambda event_id: statistics()
+    stats_tracker.fold_finished_matches(set())
+    assert stats_tracker.writer.rows('form_stats') == [('1', '99', 3, 2, 2, 5), ('2', '99', 1, 0, 0, 3)]
+    assert stats_tracker.pending_folds == {}
+
+
+def test_match_back_in_the_live_feed_is_not_folded(stats_tracker):
+    stats_tracker.live_form_players[99] = (1, 2)
+    stats_tracker.fetch_event = lambda event_id: event(status='inprogress')
+    stats_tracker.fold_finished_matches(set())
+    assert 99 in stats_tracker.pending_folds
+    stats_tracker.fold_finished_matches({99})
+    assert stats_tracker.pending_folds == {}
+    assert stats_tracker.writer.rows('form_stats') == []
+
+
+@pytest.mark.parametrize('fetched_event, fetched_statistics', [
+    (event(), {}),  # Finished, but SofaScore has no statistics for the match
+    ({}, None),  # The event was removed
+    (event(status='canceled'), None),
+])
+def test_matches_that_will_never_have_statistics_leave_the_queue(stats_tracker, fetched_event, fetched_statistics):
+    stats_tracker.live_form_players[99] = (1, 2)
+    stats_tracker.fetch_event = lambda event_id: fetched_event
+    stats_tracker.fetch_statistics = lambda event_id: fetched_statistics
+    stats_tracker.fold_finished_matches(set())
+    assert stats_tracker.pending_folds == {}
+    assert stats_tracker.writer.rows('form_stats') == []
+
+
+def test_unfinished_match_is_checked_with_backoff_and_then_given_up(stats_tracker, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tracker.time, 'time', lambda: now[0])
+    fetches = []
+    stats_tracker.fetch_event = lambda event_id: fetches.append(now[0]) or None
+    stats_tracker.live_form_players[99] = (1, 2)
+
+    stats_tracker.fold_finished_matches(set())
+    stats_tracker.fold_finished_matches(set())
+    assert fetches == [1000.0]  # The second cycle comes before the next check is due
+
+    while 99 in stats_tracker.pending_folds:
+        now[0] += tracker.PENDING_FOLD_MIN_DELAY
+        stats_tracker.fold_finished_matches(set())
+    assert len(fetches) == tracker.PENDING_FOLD_MAX_ATTEMPTS
+    assert fetches[2] - fetches[1] == 2 * tracker.PENDING_FOLD_MIN_DELAY
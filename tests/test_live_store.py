@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_store  # noqa: E402
+from live_store import LiveStateStore  # noqa: E402
+
+ROW = ('Wimbledon', 'Final', 'A', 'B', '2nd set', 'ALL', 1, None, '', '', '', '', 10, 20)
+
+
+@pytest.fixture
+def now(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(live_store.time, 'time', lambda: now[0])
+    return now
+
+
+def test_nothing_is_served_before_the_first_publish(tmp_path):
+    assert LiveStateStore().snapshot() is None
+    assert LiveStateStore(str(tmp_path / 'live.json')).snapshot() is None
+
+
+def test_published_rows_become_numbered_text_records():
+    store = LiveStateStore()
+    store.publish([ROW, ROW])
+    records = store.snapshot().records
+    assert [record.id for record in records] == [1, 2]
+    assert records[0].home_score == '1'
+    assert records[0].away_score == ''
+    assert records[0].away_player_id == '20'
+
+
+def test_snapshot_expires_after_the_published_max_age(now):
+    store = LiveStateStore()
+    store.publish([ROW], max_age=60)
+    now[0] += 60
+    assert store.snapshot() is not None
+    now[0] += 1
+    assert store.snapshot() is None
+    # An explicit max_age overrides the one attached to the snapshot
+    assert store.snapshot(max_age=120) is not None
+
+
+def test_snapshot_without_max_age_never_expires(now):
+    store = LiveStateStore()
+    store.publish([ROW])
+    now[0] += 10 ** 6
+    assert store.snapshot() is not None
+
+
+def test_other_processes_read_the_published_file_and_its_max_age(tmp_path, now):
+    path = str(tmp_path / 'live.json')
+    LiveStateStore(path).publish([ROW], max_age=60)
+    reader = LiveStateStore(path)
+    snapshot = reader.snapshot()
+    assert snapshot.records[0].tournament == 'Wimbledon'
+    assert snapshot.max_age == 60
+    now[0] += 61
+    assert reader.snapshot() is None
+
+
+def test_reader_reloads_only_when_the_file_changes(tmp_path):
+    path = str(tmp_path / 'live.json')
+    publisher = LiveStateStore(path)
+    publisher.publish([ROW])
+    reader = LiveStateStore(path)
+    first = reader.snapshot()
+    assert reader.snapshot() is first
+
+    publisher.publish([ROW, ROW])
+    # Make sure the modification time moves even on filesystems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert len(reader.snapshot().records) == 2
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiler as profiler_module  # noqa: E402
+from profiler import Profiler  # noqa: E402
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return Profiler('test', str(tmp_path))
+
+
+def run_cycle(profiler):
+    with profiler.stage('cycle'):
+        with profiler.stage('work'):
+            sum(range(100))
+    profiler.end_cycle()
+
+
+def test_inactive_profiler_records_nothing(profiler):
+    run_cycle(profiler)
+    assert profiler.last_report is None
+    assert os.listdir(profiler.output_dir) == []
+
+
+def test_session_ends_after_its_cycles_and_writes_a_report(profiler):
+    assert profiler.start(cycles=2)
+    assert not profiler.start(cycles=2)
+    run_cycle(profiler)
+    assert profiler.active
+    run_cycle(profiler)
+    assert not profiler.active
+    assert os.path.exists(profiler.last_report['profile'])
+    assert os.path.exists(profiler.last_report['stages'])
+    stages = [line.split()[0] for line in profiler.last_report['breakdown'].splitlines()[1:]]
+    assert sorted(stages) == ['cycle', 'work']
+
+
+def test_timed_session_ends_on_a_status_check_without_traffic(profiler):
+    profiler.start(seconds=0.01)
+    time.sleep(0.02)
+    assert profiler.active
+    profiler.finish_if_due()
+    assert not profiler.active
+    assert profiler.last_report['profile'] is None
+
+
+def test_timed_session_can_be_restarted_once_its_deadline_passed(profiler):
+    profiler.start(seconds=0.01)
+    time.sleep(0.02)
+    assert profiler.start(seconds=1)
+
+
+def test_requested_toggle_starts_and_stops_at_cycle_boundaries(profiler):
+    profiler.request_toggle()
+    assert not profiler.active
+    profiler.end_cycle()
+    assert profiler.active
+    assert profiler.remaining_cycles == profiler_module.DEFAULT_PROFILE_CYCLES
+
+    profiler.request_toggle()
+    run_cycle(profiler)
+    assert not profiler.active
+    assert profiler.last_report is not None
+
+
+def test_broadcast_request_starts_other_profilers(tmp_path):
+    request_path = str(tmp_path / 'request.json')
+    first = Profiler('first', str(tmp_path), request_path=request_path)
+    second = Profiler('second', str(tmp_path), request_path=request_path)
+    first.start(seconds=30)
+    first.broadcast(30)
+
+    second.poll_request()
+    assert second.active
+    assert 25 < second.deadline - time.monotonic() <= 30
+
+    # The request is handled once: a profiler that finished early does not restart from it
+    second.stop()
+    second.finish_if_due()
+    second._next_poll = 0
+    second.poll_request()
+    assert not second.active
+    first._next_poll = 0
+    first.poll_request()
+    assert first.active
+
+
+def test_expired_request_is_ignored(tmp_path):
+    request_path = str(tmp_path / 'request.json')
+    Profiler('first', str(tmp_path), request_path=request_path).broadcast(0)
+    second = Profiler('second', str(tmp_path), request_path=request_path)
+    second.poll_request()
+    assert not second.active
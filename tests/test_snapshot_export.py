@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot_export import SnapshotExporter, detect_format, load_snapshot  # noqa: E402
+
+LIVE_ROW = ('Wimbledon', 'Final', 'A', 'B', '2nd set', 'ALL', 1, 0, None, None, None, None, 10, 20)
+TODAY = time.strftime('%Y-%m-%d')  # Matches are dated by local start time
+LIVE_TODAY = datetime.now(timezone.utc).strftime('%Y-%m-%d')  # Live rows by UTC capture time
+
+
+def match_row(match_id, day='2020-01-01', tournament='Wimbledon', home_score=None):
+    return (match_id, tournament, 'Ended', f'{day} 12:00:00', 'A', 'B', home_score, None, '10')
+
+
+def part_files(export_dir, table_name, day, tournament='Wimbledon'):
+    return sorted(os.listdir(os.path.join(export_dir, table_name, f'date={day}', f'tournament={tournament}')))
+
+
+@pytest.fixture(params=['parquet', 'arrow'])
+def exporter(request, tmp_path):
+    return SnapshotExporter(str(tmp_path), export_interval=3600, export_format=request.param)
+
+
+def test_each_export_writes_only_rows_added_since_the_last_one(exporter):
+    exporter.add_live_row(LIVE_ROW)
+    exporter.export()
+    exporter.add_live_row(LIVE_ROW)
+    exporter.add_live_row(LIVE_ROW)
+    exporter.export()
+    exporter.export()
+    assert load_snapshot(exporter.export_dir, 'live_tennis_data').num_rows == 3
+    assert len(part_files(exporter.export_dir, 'live_tennis_data', LIVE_TODAY)) == 2
+
+
+def test_match_rows_are_exported_once_per_match(exporter):
+    exporter.add_match_row(match_row('1', TODAY))
+    exporter.add_match_row(match_row('1', TODAY, home_score='6'))
+    exporter.export()
+    exporter.add_match_row(match_row('1', TODAY))
+    exporter.export()
+    table = load_snapshot(exporter.export_dir, 'player_matches_info')
+    assert table.column('match_id').to_pylist() == ['1']
+    assert table.column('home_score').to_pylist() == ['6']
+
+
+def test_columns_without_values_keep_the_string_type(exporter):
+    exporter.add_live_row(LIVE_ROW)
+    exporter.add_match_row(match_row('1'))
+    exporter.export()
+    live = load_snapshot(exporter.export_dir, 'live_tennis_data')
+    matches = load_snapshot(exporter.export_dir, 'player_matches_info')
+    assert str(live.schema.field('statistic_group').type) == 'string'
+    assert str(live.schema.field('captured_at').type) == 'timestamp[us, tz=UTC]'
+    assert str(matches.schema.field('away_score').type) == 'string'
+
+
+def test_finished_dates_are_compacted_into_one_file(exporter):
+    for match_id in ('1', '2', '3'):
+        exporter.add_match_row(match_row(match_id))
+        exporter.add_match_row(match_row(f'today-{match_id}', TODAY))
+        exporter.export()
+    assert len(part_files(exporter.export_dir, 'player_matches_info', '2020-01-01')) == 1
+    assert len(part_files(exporter.export_dir, 'player_matches_info', TODAY)) == 3
+    table = load_snapshot(exporter.export_dir, 'player_matches_info')
+    assert sorted(table.column('match_id').to_pylist()) == ['1', '2', '3', 'today-1', 'today-2', 'today-3']
+
+
+def test_load_snapshot_detects_the_export_format(exporter):
+    exporter.add_match_row(match_row('1'))
+    exporter.export()
+    table_dir = os.path.join(exporter.export_dir, 'player_matches_info')
+    assert detect_format(table_dir) == exporter.export_format
+    assert load_snapshot(exporter.export_dir, 'player_matches_info').num_rows == 1
+
+
+def test_failed_export_is_logged_and_keeps_the_rows(exporter, tmp_path):
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('')
+    exporter.export_dir = str(blocker)  # A file, so the table directory cannot be created
+    exporter.export_interval = 0
+    exporter.add_live_row(LIVE_ROW)
+    exporter.maybe_export()
+    assert len(exporter.live_rows) == 1
+
+    exporter.export_dir = str(tmp_path / 'exports')
+    exporter.maybe_export()
+    assert exporter.live_rows == []
+    assert load_snapshot(exporter.export_dir, 'live_tennis_data').num_rows == 1
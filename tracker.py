@@ -0,0 +1,462 @@
+from psycopg2.extras import execute_values
+import requests
+import time
+import random
+import logging
+import signal
+
+import config
+from db_writer import BufferedWriter
+from live_store import LiveStateStore
+from profiler import Profiler
+from snapshot_export import SnapshotExporter
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constants
+HTTP_OK = 200
+HTTP_FORBIDDEN = 403
+HTTP_NOT_FOUND = 404
+HTTP_RETRY_MIN_DELAY = 10
+HTTP_RETRY_MAX_DELAY = 30
+HTTP_TIMEOUT = 30  # Seconds to wait for SofaScore to connect or send data
+HTTP_TRANSIENT_STATUSES = (403, 429, 500, 502, 503, 504)  # Rate limiting and server errors worth retrying
+HTTP_BACKOFF_DELAY = 2  # Seconds before the first retry, doubled after each one
+PENDING_FOLD_TIMEOUT = 24 * 60 * 60  # Seconds to wait for a match that left the live feed to be marked finished
+PENDING_FOLD_MAX_ATTEMPTS = 12
+PENDING_FOLD_MIN_DELAY = 60  # Seconds before checking a pending match again, doubled after each check
+PENDING_FOLD_MAX_DELAY = 60 * 60
+FORM_STATISTICS = [("Service", "Aces"), ("Service", "Double faults"), ("Return", "Break points converted")]
+
+def parse_stat_count(value):
+    try:
+        return int(str(value).split()[0])
+    except (ValueError, IndexError):
+        return 0
+
+def parse_stat_ratio(value):
+    # Ratio statistics look like "3/7 (43%)"
+    try:
+        won, total = str(value).split()[0].split('/')
+        return int(won), int(total)
+    except ValueError:
+        return 0, 0
+
+
+# Write operations run by the BufferedWriter, each taking a cursor and a list of rows.
+# Rows may be replayed from the spool after an outage, so every operation is idempotent.
+def execute_statements(cursor, statements):
+    for statement in statements:
+        cursor.execute(statement)
+
+def truncate_live_data(cursor, rows):
+    cursor.execute("TRUNCATE Live_Tennis_Data")
+
+def insert_live_rows(cursor, rows):
+    execute_values(cursor, "INSERT INTO Live_Tennis_Data VALUES %s", rows)
+
+def insert_players(cursor, players):
+    execute_values(cursor, "INSERT INTO Players_main_info VALUES %s ON CONFLICT (player_id) DO NOTHING", players)
+
+def insert_matches(cursor, matches):
+    execute_values(cursor, '''INSERT INTO Player_matches_info
+                   (match_id, tournament, status, start_time, home_team, away_team,
+                   home_score, away_score, player_id)
+                   VALUES %s
+                   ON CONFLICT (match_id) DO NOTHING''', matches)
+
+def mark_form_ledger(cursor, column, keys):
+    # Returns the (player_id, match_id) pairs whose column was not set before, so each is counted once
+    counted = execute_values(cursor, f'''INSERT INTO player_form_ledger (player_id, match_id, {column})
+                             VALUES %s
+                             ON CONFLICT (player_id, match_id) DO UPDATE SET {column} = TRUE
+                             WHERE player_form_ledger.{column} = FALSE
+                             RETURNING player_id, match_id''',
+                             [(player_id, match_id, True) for player_id, match_id in keys], fetch=True)
+    return [tuple(key) for key in counted]
+
+def count_form_results(cursor, results):
+    # A dict also drops repeats of the same pair, which ON CONFLICT DO UPDATE rejects within one statement
+    latest = {(player_id, match_id): won for player_id, match_id, won in results}
+    totals = {}
+    for key in mark_form_ledger(cursor, 'result_counted', latest):
+        played, wins = totals.get(key[0], (0, 0))
+        totals[key[0]] = (played + 1, wins + int(latest[key]))
+    if totals:
+        execute_values(cursor, '''INSERT INTO player_form_stats (player_id, matches_played, wins, losses)
+                       VALUES %s
+                       ON CONFLICT (player_id) DO UPDATE SET
+                       matches_played = player_form_stats.matches_played + EXCLUDED.matches_played,
+                       wins = player_form_stats.wins + EXCLUDED.wins,
+                       losses = player_form_stats.losses + EXCLUDED.losses,
+                       updated_at = NOW()''',
+                       [(player_id, played, wins, played - wins) for player_id, (played, wins) in totals.items()])
+
+def count_form_stats(cursor, stats):
+    latest = {(player_id, match_id): values for player_id, match_id, *values in stats}
+    totals = {}
+    for key in mark_form_ledger(cursor, 'stats_counted', latest):
+        matches, *sums = totals.get(key[0], (0, 0, 0, 0, 0))
+        totals[key[0]] = (matches + 1, *(total + value for total, value in zip(sums, latest[key])))
+    if totals:
+        execute_values(cursor, '''INSERT INTO player_form_stats
+                       (player_id, stat_matches, aces, double_faults, break_points_won, break_points_total)
+                       VALUES %s
+                       ON CONFLICT (player_id) DO UPDATE SET
+                       stat_matches = player_form_stats.stat_matches + EXCLUDED.stat_matches,
+                       aces = player_form_stats.aces + EXCLUDED.aces,
+                       double_faults = player_form_stats.double_faults + EXCLUDED.double_faults,
+                       break_points_won = player_form_stats.break_points_won + EXCLUDED.break_points_won,
+                       break_points_total = player_form_stats.break_points_total + EXCLUDED.break_points_total,
+                       updated_at = NOW()''',
+                       [(player_id, *values) for player_id, values in totals.items()])
+
+TRACKER_OPERATIONS = {
+    'execute': execute_statements,
+    'truncate_live': truncate_live_data,
+    'live_rows': insert_live_rows,
+    'players': insert_players,
+    'matches': insert_matches,
+    'form_results': count_form_results,
+    'form_stats': count_form_stats
+}
+# A truncate makes every earlier live row obsolete, so replaying a spool skips them
+TRACKER_RESETS = {'truncate_live': ('truncate_live', 'live_rows')}
+
+class TennisStatsTracker:
+    
+    def __init__(self, db_config, live_store=None, profiler=None, writer=None, exporter=None, role='tracker'):
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+        }
+        # Writes are buffered and committed in the background, so a slow or unavailable DB never stalls fetching
+        self.writer = writer or BufferedWriter(db_config, TRACKER_OPERATIONS, config.spool_path(role), resets=TRACKER_RESETS)
+        self.live_store = live_store
+        self.exporter = exporter
+        self.profiler = profiler or Profiler('tracker', config.PROFILE_DIR)
+        self.live_form_players = {}  # event ID -> (home ID, away ID) while the match is in the live feed
+        # event ID -> (home ID, away ID, time it left the live feed, checks so far, time of next check) until it is finished
+        self.pending_folds = {}
+
+    def close(self):
+        try:
+            if self.exporter:
+                self.exporter.export()
+        finally:
+            self.writer.close()
+
+    def fetch_statistics(self, event_id):
+        url = f'https://api.sofascore.com/api/v1/event/{event_id}/statistics'
+        response = requests.get(url, headers=self.headers)
+        if response.status_code == HTTP_OK:
+            return response.json()
+        elif response.status_code == HTTP_NOT_FOUND:
+            # Many lower-tier matches have no statistics at all
+            return {}
+        elif response.status_code == HTTP_FORBIDDEN:
+            logger.error(f"Failed to fetch statistics for event ID {event_id}. Forbidden: You may be rate-limited or unauthorized.")
+            return None
+        else:
+            logger.error(f"Failed to fetch statistics for event ID {event_id}. Status code: {response.status_code}")
+            return None
+
+    def extract_statistics(self, statistics_data, group_name, statistic_name):
+        for group in statistics_data.get('statistics', []):
+            if group['period'] == 'ALL':
+                for subgroup in group['groups']:
+                    if subgroup['groupName'] == group_name:
+                        for statistic in subgroup['statisticsItems']:
+                            if statistic['name'] == statistic_name:
+                                return statistic['home'], statistic['away']
+        return 'N/A', 'N/A'
+
+    def create_table_if_not_exists(self):
+        self.writer.write('execute', '''CREATE TABLE IF NOT EXISTS Live_Tennis_Data
+                 (tournament TEXT, round TEXT, home_team TEXT, away_team TEXT, match_progress TEXT, 
+                 period TEXT, home_score TEXT, away_score TEXT, statistic_group TEXT, statistic_name TEXT, 
+                 home_stat TEXT, away_stat TEXT, home_player_id TEXT, away_player_id TEXT)''')
+
+    def truncate_table(self):
+        self.writer.write('truncate_live', None)
+
+    def create_player_table_if_not_exists(self):
+        self.writer.write('execute', '''CREATE TABLE IF NOT EXISTS Players_main_info
+                 (player_id TEXT, name TEXT, country TEXT, ranking INTEGER, PRIMARY KEY (player_id))''')
+
+    def insert_player_data(self, player_data):
+        self.writer.write('players', tuple(player_data))
+
+    def create_player_matches_table_if_not_exists(self):
+        self.writer.write('execute', '''CREATE TABLE IF NOT EXISTS Player_matches_info
+                (match_id TEXT PRIMARY KEY, tournament TEXT, status TEXT, start_time TEXT, 
+                home_team TEXT, away_team TEXT, home_score TEXT, away_score TEXT, player_id TEXT)''')
+
+    def match_row(self, match_data):
+        return (str(match_data['id']), match_data['tournament'], match_data['status'], match_data['start_time'],
+                match_data['home_team'], match_data['away_team'], match_data['home_score'],
+                match_data['away_score'], str(match_data['player_id']))
+
+    def insert_match_data(self, match_data):
+        row = self.match_row(match_data)
+        self.writer.write('matches', row)
+        if self.exporter:
+            self.exporter.add_match_row(row)
+
+    def create_player_form_tables_if_not_exists(self):
+        self.writer.write('execute', '''CREATE TABLE IF NOT EXISTS player_form_stats
+                (player_id TEXT PRIMARY KEY, matches_played INTEGER NOT NULL DEFAULT 0, wins INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0, stat_matches INTEGER NOT NULL DEFAULT 0, aces INTEGER NOT NULL DEFAULT 0,
+                double_faults INTEGER NOT NULL DEFAULT 0, break_points_won INTEGER NOT NULL DEFAULT 0,
+                break_points_total INTEGER NOT NULL DEFAULT 0, updated_at TIMESTAMP NOT NULL DEFAULT NOW())''')
+        # Ledger of what has been folded into player_form_stats, so each match is counted once per player
+        self.writer.write('execute', '''CREATE TABLE IF NOT EXISTS player_form_ledger
+                (player_id TEXT, match_id TEXT, result_counted BOOLEAN NOT NULL DEFAULT FALSE,
+                stats_counted BOOLEAN NOT NULL DEFAULT FALSE, PRIMARY KEY (player_id, match_id))''')
+
+    def update_player_form_stats(self, player_id, match_id, stats):
+        aces = parse_stat_count(stats.get('Aces', 0))
+        double_faults = parse_stat_count(stats.get('Double faults', 0))
+        break_points_won, break_points_total = parse_stat_ratio(stats.get('Break points converted', ''))
+        self.writer.write('form_stats', (str(player_id), str(match_id), aces, double_faults,
+                                         break_points_won, break_points_total))
+
+    def fetch_event(self, event_id):
+        url = f'https://api.sofascore.com/api/v1/event/{event_id}'
+        response = requests.get(url, headers=self.headers)
+        if response.status_code == HTTP_OK:
+            return response.json().get('event')
+        elif response.status_code == HTTP_NOT_FOUND:
+            # The event was removed, so it will never finish
+            return {}
+        logger.error(f"Failed to fetch event ID {event_id}. Status code: {response.status_code}")
+        return None
+
+    def fold_finished_matches(self, live_event_ids):
+        # A match leaving the live feed may only be suspended, or the feed may have glitched, so each one
+        # is checked with a growing delay until SofaScore reports it finished and then folded with its
+        # final statistics. A finished match without statistics, or a removed event, is done with.
+        now = time.time()
+        for event_id in set(self.live_form_players) - live_event_ids:
+            self.pending_folds[event_id] = self.live_form_players.pop(event_id) + (now, 0, now)
+        for event_id in list(self.pending_folds):
+            home_player_id, away_player_id, left_live_at, attempts, next_check_at = self.pending_folds[event_id]
+            if event_id in live_event_ids:
+                del self.pending_folds[event_id]
+                continue
+            if now < next_check_at:
+                continue
+            event = self.fetch_event(event_id)
+            status = event['status']['type'] if event else None
+            if event == {} or status in ('canceled', 'postponed'):
+                del self.pending_folds[event_id]
+                continue
+            if status == 'finished':
+                statistics = self.fetch_statistics(event_id)
+                if statistics is not None:
+                    if statistics.get('statistics'):
+                        stats = {name: self.extract_statistics(statistics, group, name) for group, name in FORM_STATISTICS}
+                        self.update_player_form_stats(home_player_id, event_id, {name: home for name, (home, away) in stats.items()})
+                        self.update_player_form_stats(away_player_id, event_id, {name: away for name, (home, away) in stats.items()})
+                    del self.pending_folds[event_id]
+                    continue
+            attempts += 1
+            if attempts >= PENDING_FOLD_MAX_ATTEMPTS or now - left_live_at > PENDING_FOLD_TIMEOUT:
+                logger.warning(f"Giving up on form statistics for event ID {event_id}, last status {status}")
+                del self.pending_folds[event_id]
+                continue
+            delay = min(PENDING_FOLD_MIN_DELAY * 2 ** (attempts - 1), PENDING_FOLD_MAX_DELAY)
+            self.pending_folds[event_id] = (home_player_id, away_player_id, left_live_at, attempts, now + delay)
+
+    def fetch_player_data(self, player_id, page=0, retries=0):
+        # Retries rate limiting, server errors and network errors up to `retries` times with exponential
+        # backoff; a network error on the last attempt is raised as a requests.RequestException
+        url = f'https://api.sofascore.com/api/v1/team/{player_id}/events/last/{page}'
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(HTTP_BACKOFF_DELAY * 2 ** (attempt - 1))
+            try:
+                response = requests.get(url, headers=self.headers, timeout=HTTP_TIMEOUT)
+            except requests.RequestException as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"Error fetching player data for player ID {player_id}, retrying: {e}")
+                continue
+            if response.status_code == HTTP_OK:
+                return response.json()
+            elif response.status_code == HTTP_NOT_FOUND:
+                # SofaScore answers 404 once a player's history runs out of pages
+                return {'events': [], 'hasNextPage': False}
+            elif response.status_code not in HTTP_TRANSIENT_STATUSES:
+                break
+        logger.error(f"Failed to fetch player data for player ID {player_id}. Status code: {response.status_code}")
+        return None
+
+    def retrieve_and_store_players_data(self, events):
+        player_ids = set()  # Using a set to ensure unique player IDs
+        for event in events:
+            player_ids.add(event['homeTeam']['id'])
+            player_ids.add(event['awayTeam']['id'])
+        
+        for player_id in player_ids:
+            player_data = self.fetch_player_data(player_id)
+            if player_data and player_data['events']:
+                self.store_player_data(player_data, player_id)
+
+    def store_player_data(self, player_data, player_id):
+        home_team = player_data['events'][0]['homeTeam']
+        name = home_team.get('name', 'Unknown')
+        country = home_team.get('country', {}).get('name', 'Unknown')
+        ranking = int(home_team.get('ranking', 0))
+        player_info = (
+            str(player_id),
+            name,
+            country,
+            ranking
+        )
+        self.insert_player_data(player_info)
+        self.store_player_matches(player_data['events'], player_id)
+
+    def build_match(self, event, player_id):
+        tournament_name = event['tournament']['name'] if 'tournament' in event else 'Unknown'
+        home_score = event['homeScore'].get('current', 'N/A')
+        away_score = event['awayScore'].get('current', 'N/A')
+        if event['status']['type'] == 'finished':
+            home_score = event['homeScore'].get('display', 'N/A')
+            away_score = event['awayScore'].get('display', 'N/A')
+        return {
+            'id': event['id'],
+            'tournament': tournament_name,
+            'status': event['status']['description'],
+            'start_time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event['startTimestamp'])),
+            'home_team': event['homeTeam']['name'],
+            'away_team': event['awayTeam']['name'],
+            'home_score': home_score,
+            'away_score': away_score,
+            'player_id': player_id
+        }
+
+    def match_result(self, event, player_id):
+        # True/False for a finished match the player won/lost, None when there is no result yet
+        if event['status']['type'] != 'finished' or event.get('winnerCode') not in (1, 2):
+            return None
+        is_home = event['homeTeam']['id'] == player_id
+        return (event['winnerCode'] == 1) == is_home
+
+    def store_player_matches(self, events, player_id):
+        matches = []
+        results = {}
+        for event in events:
+            matches.append(self.build_match(event, player_id))
+            won = self.match_result(event, player_id)
+            if won is not None:
+                results[(str(player_id), str(event['id']))] = won
+        self.write_player_matches(matches, results)
+
+    def write_player_matches(self, matches, results):
+        # All match rows first, then all results, so the writer batches each into one statement
+        rows = [self.match_row(match) for match in matches]
+        self.writer.write('matches', *rows)
+        if self.exporter:
+            for row in rows:
+                self.exporter.add_match_row(row)
+        self.writer.write('form_results', *((player_id, match_id, won) for (player_id, match_id), won in results.items()))
+
+    def store_player_matches_bulk(self, matches, results):
+        # Waits until the batch is committed or safely spooled, so callers can checkpoint after it
+        self.write_player_matches(matches, results)
+        self.writer.flush()
+
+    def insert_data(self, data):
+        self.writer.write('live_rows', tuple(data))
+        if self.exporter:
+            self.exporter.add_live_row(data)
+
+    def live_snapshot_max_age(self, cycle_seconds):
+        # The next snapshot lands after the sleep plus another cycle of about the same length,
+        # so allow two cycles of slack before readers fall back to the database
+        return max(config.LIVE_SNAPSHOT_MAX_AGE, 2 * cycle_seconds + HTTP_RETRY_MAX_DELAY)
+
+    def track_stats(self):
+        profiler = self.profiler
+        while True:
+            cycle_started = time.monotonic()
+            with profiler.stage('fetch_live'):
+                response = requests.get('https://api.sofascore.com/api/v1/sport/tennis/events/live', headers=self.headers)
+            if response.status_code == HTTP_OK:
+                live = response.json()
+                with profiler.stage('truncate'):
+                    self.truncate_table()
+                with profiler.stage('players'):
+                    self.retrieve_and_store_players_data(live['events'])
+                live_rows = []
+                for event in live['events']:
+                    event_id = event['id']
+                    data = (
+                        event['tournament']['name'], event['roundInfo']['name'], event['homeTeam']['name'],
+                        event['awayTeam']['name'], event['status']['description'], 'ALL',
+                        event['homeScore']['current'], event['awayScore']['current'], '', '', '', '',
+                        event['homeTeam']['id'], event['awayTeam']['id']  # Include player IDs
+                    )
+                    with profiler.stage('statistics'):
+                        statistics = self.fetch_statistics(event_id)
+                    event_rows = []
+                    if statistics:
+                        statistics_mapping = {
+                            "Service": ["Aces", "Double faults", "First serve", "Second serve",
+                                        "First serve points", "Second serve points", "Service games played", "Break points saved"],
+                            "Points": ["Total", "Service points won", "Receiver points won", "Max points in a row"],
+                            "Games": ["Total", "Service games won", "Max games in a row"],
+                            "Return": ["First serve return points", "Second serve return points", "Return games played", "Break points converted"]
+                        }
+                        for group, stats in statistics_mapping.items():
+                            for stat_name in stats:
+                                home_stat, away_stat = self.extract_statistics(statistics, group, stat_name)
+                                data = data[:8] + (group, stat_name, home_stat, away_stat) + data[12:]  # Preserve player IDs
+                                event_rows.append(data)
+                    else:
+                        event_rows.append(data)
+                    self.live_form_players[event_id] = (event['homeTeam']['id'], event['awayTeam']['id'])
+                    with profiler.stage('live_insert'):
+                        for row in event_rows:
+                            self.insert_data(row)
+                    live_rows.extend(event_rows)
+                if self.live_store:
+                    with profiler.stage('publish'):
+                        self.live_store.publish(live_rows, self.live_snapshot_max_age(time.monotonic() - cycle_started))
+                with profiler.stage('fold_form'):
+                    self.fold_finished_matches({event['id'] for event in live['events']})
+                if self.exporter:
+                    with profiler.stage('export'):
+                        self.exporter.maybe_export()
+                profiler.end_cycle()
+                random_delay = random.randint(HTTP_RETRY_MIN_DELAY, HTTP_RETRY_MAX_DELAY)
+                logger.info(f"Waiting for {random_delay} seconds before fetching data again...")
+                time.sleep(random_delay)
+            else:
+                logger.error(f"Failed to retrieve data. Status code: {response.status_code}")
+
+
+def main():
+    exporter = None
+    if config.EXPORT_DIR:
+        exporter = SnapshotExporter(config.EXPORT_DIR, config.EXPORT_INTERVAL, config.EXPORT_FORMAT)
+    tracker = TennisStatsTracker(config.tracker_db_config(), live_store=LiveStateStore(config.LIVE_SNAPSHOT_PATH),
+                                 profiler=Profiler('tracker', config.PROFILE_DIR), exporter=exporter)
+    tracker.create_table_if_not_exists()
+    tracker.create_player_table_if_not_exists()
+    tracker.create_player_matches_table_if_not_exists()
+    tracker.create_player_form_tables_if_not_exists()
+    # `kill -USR1 <pid>` starts profiling from the next cycle, or ends a running session when the cycle ends
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: tracker.profiler.request_toggle())
+    try:
+        tracker.track_stats()
+    finally:
+        # Commit or spool whatever is still buffered before exiting
+        tracker.close()
+
+
+if __name__ == "__main__":
+    main()